@@ -35,6 +35,7 @@ manual.
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtWidgets import *
 from PyQt5.QtGui import *
 
@@ -55,12 +56,44 @@ DEBUG = None
 icons_dir = os.path.join(mw.pm.addonFolder(), 'downloadaudio', 'icons')
 """Place were we keep our megaphone icon.."""
 
-# A bit of set-up
-for downloader in downloaders:
-    # We have two audio "processors". One that is actually processing,
-    # and one where we would have to move files around, but where we
-    # can skip that step. Let the downloaders know which one we have.
-    downloader.use_temp_files = processor.useful
+
+def download_with(dloader, field_data, language):
+    """
+    Download audio for all the fields from one site.
+
+    This is run in a worker thread by do_download(), one thread per
+    downloader. The fields are done one after the other, as the
+    downloader keeps the state of the current download. Return a list
+    with one (downloads_list, display_text, base_name,
+    show_skull_and_bones) tuple per field, or None for fields where
+    the download failed.
+    """
+    results = []
+    for (source, dest, text, base, ruby, split) in field_data:
+        # Use a public variable to set the language.
+        dloader.language = language
+        # We have two audio "processors". One that is actually
+        # processing, and one where we would have to move files
+        # around, but where we can skip that step. Let the
+        # downloaders know which one we have. (Done here, as the
+        # downloaders are only created when we first use them.)
+        dloader.use_temp_files = processor.useful
+        try:
+            # Make it easer inside the downloader. If anything
+            # goes wrong, don't catch, or raise whatever you want.
+            dloader.download_files(text, base, ruby, split)
+        except:
+            ## Uncomment this raise while testing a new
+            ## downloaders.  Also comment out all the others in the
+            ## downloaders list in downloaders.__init__
+            if DEBUG:
+                raise
+            results.append(None)
+            continue
+        results.append((
+            dloader.downloads_list, dloader.display_text,
+            dloader.base_name, dloader.show_skull_and_bones))
+    return results
 
 
 def do_download(note, field_data, language, hide_text=False):
@@ -70,27 +103,29 @@ def do_download(note, field_data, language, hide_text=False):
     Go through the list of words and list of sites and download each
     word from each site. Then call a function that asks the user what
     to do.
+
+    The sites are asked at the same time, each in its own thread. The
+    work is waiting for the network, so the threads overlap nicely.
+    The results are used in the same order as before, by field and
+    then by site.
     """
     retrieved_files_list = []
     show_skull_and_bones = False
-    for (source, dest, text, base, ruby, split) in field_data:
-        for dloader in downloaders:
-            # Use a public variable to set the language.
-            dloader.language = language
-            try:
-                # Make it easer inside the downloader. If anything
-                # goes wrong, don't catch, or raise whatever you want.
-                dloader.download_files(text, base, ruby, split)
-            except:
-                ## Uncomment this raise while testing a new
-                ## downloaders.  Also comment out all the others in the
-                ## downloaders list in downloaders.__init__
-                if DEBUG:
-                    raise
+    dloader_list = list(downloaders)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        dloader_futures = [
+            executor.submit(download_with, dloader, field_data, language)
+            for dloader in dloader_list]
+        dloader_results = [future.result() for future in dloader_futures]
+    for field_index, (source, dest, text, base, ruby, split) \
+            in enumerate(field_data):
+        for dloader, results in zip(dloader_list, dloader_results):
+            if not results[field_index]:
                 continue
-            show_skull_and_bones = \
-                show_skull_and_bones or dloader.show_skull_and_bones
-            for word_path, file_name, extras in dloader.downloads_list:
+            downloads_list, display_text, base_name, skull_and_bones = \
+                results[field_index]
+            show_skull_and_bones = show_skull_and_bones or skull_and_bones
+            for word_path, file_name, extras in downloads_list:
                 try:
                     item_hash = get_hash(word_path)
                 except ValueError:
@@ -107,7 +142,7 @@ def do_download(note, field_data, language, hide_text=False):
                         # downloader downloads to a temp file, so move
                         # here.
                         file_name = processor.process_and_move(
-                            word_path, dloader.base_name)
+                            word_path, base_name)
                     except:
                         if DEBUG:
                             raise  # Use this to debug an audio processor.
@@ -117,8 +152,8 @@ def do_download(note, field_data, language, hide_text=False):
                 #    file_name = file_name
                 # We pass the file name around for this case.
                 retrieved_files_list.append((
-                    source, dest, dloader.display_text,
-                    file_name, item_hash, extras, dloader.site_icon))
+                    source, dest, display_text,
+                    file_name, item_hash, extras, dloader.get_site_icon()))
     try:
         store_or_blacklist(
             note, retrieved_files_list, show_skull_and_bones, hide_text)
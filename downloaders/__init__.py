@@ -18,18 +18,15 @@ When PyQt4 is installed, this downolads the site icon (favicon) for
 each site first.
 """
 
-# from .google_tts import GooglettsDownloader
-# from .howjsay import HowJSayDownloader
-from .japanesepod import JapanesepodDownloader
-# from .wiktionary import WiktionaryDownloader
-
-downloaders = [
-    JapanesepodDownloader(),
-#    HowJSayDownloader(),
-#    WiktionaryDownloader(),
-#    GooglettsDownloader(),
+import importlib
+
+downloader_classes = [
+    ('.japanesepod', 'JapanesepodDownloader'),
+#    ('.howjsay', 'HowJSayDownloader'),
+#    ('.wiktionary', 'WiktionaryDownloader'),
+#    ('.google_tts', 'GooglettsDownloader'),
 ]
-# This is the list of downloaders.
+# This is the list of downloaders, as (module, class name) pairs.
 #
 # These sites are tried in the order they appear here. Lines starting
 # with a '#' are not tried. Change the order, or which lines get the
@@ -37,8 +34,39 @@ downloaders = [
 
 
 # # For testing.
-# downloaders = [
-#     DictNNDownloader(),
+# downloader_classes = [
+#     ('.dictnn', 'DictNNDownloader'),
 # ]
 
+
+class LazyDownloaders(object):
+    """
+    The downloaders, created when they are first used.
+
+    Iterating over this gives the downloaders in the order of the
+    class list, like iterating over a plain list would. But a
+    downloader's module is only imported and the downloader only
+    created the first time we go through the list, not when Anki
+    loads the add-on. After that, we keep and reuse the instances.
+    """
+    def __init__(self, class_list):
+        self.class_list = class_list
+        self.instances = {}
+
+    def __iter__(self):
+        for module_name, class_name in self.class_list:
+            try:
+                yield self.instances[(module_name, class_name)]
+            except KeyError:
+                module = importlib.import_module(module_name, __name__)
+                dloader = getattr(module, class_name)()
+                self.instances[(module_name, class_name)] = dloader
+                yield dloader
+
+    def __len__(self):
+        return len(self.class_list)
+
+
+downloaders = LazyDownloaders(downloader_classes)
+
 __all__ = ['downloaders']
@@ -77,11 +77,7 @@ class CollinsDownloader(AudioDownloader):
             return
         link_list = uniqify_list(link_list)
         self.maybe_get_icon()
-        for lnk in link_list:
-            word_data = self.get_data_from_url(lnk)
-            word_path, word_fname = self.get_file_name()
-            with open(word_path, 'wb') as word_file:
-                word_file.write(word_data)
+        for word_path, word_fname in self.get_files_from_urls(link_list):
             self.downloads_list.append(
                 (word_path, word_fname, self.extras))
 
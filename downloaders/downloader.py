@@ -10,30 +10,305 @@
 Class to download a files from a speaking dictionary or TTS service.
 '''
 
+import functools
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
 import tempfile
-import urllib.request, urllib.parse, urllib.error
-import urllib.request, urllib.error, urllib.parse
+import threading
+import time
 import urllib.parse
-from bs4 import BeautifulSoup as soup
-from aqt.utils import showInfo
+from concurrent.futures import ThreadPoolExecutor
+import urllib3
 
 DEBUG = None
 
-# Make this work without PyQt
-with_pyqt = True
-try:
-    from PyQt5.QtGui import QImage
-    from PyQt5.QtCore import QSize, Qt
-except ImportError:
-    with_pyqt = False
+user_files_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'user_files')
+"""
+Where we keep data between Anki sessions.
+
+Anki keeps the user_files folder when the add-on is updated.
+"""
+
+icon_cache_dir = os.path.join(user_files_dir, 'icon_cache')
+"""Where we keep the site icons."""
+
+page_cache_dir = os.path.join(user_files_dir, 'page_cache')
+"""Where we keep downloaded pages, to ask the site if they changed."""
+
+page_cache_max_files = 200
+"""How many pages we keep at most. The oldest are removed first."""
+
+page_cache_max_age = 30 * 24 * 60 * 60
+"""Remove pages from the cache after this many seconds (30 days)."""
+
+icon_page_head_size = 16384
+"""
+How much of the icon_url page we look at to find the icon link.
+
+The link tag lives in the head, which should be near the start.
+"""
+
+link_tag_re = re.compile(rb'<link\b[^>]*>', re.IGNORECASE)
+"""Find the link tags in a page."""
+
+tag_attribute_re = re.compile(
+    rb'''([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''')
+"""Split a tag into (name, value) attributes, quoted or not."""
+
+_http = urllib3.PoolManager(
+    num_pools=8, maxsize=8,
+    timeout=urllib3.Timeout(connect=5, read=10),
+    retries=urllib3.Retry(
+        total=None, connect=3, read=3, status=3, other=3, redirect=10,
+        backoff_factor=0.3, status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']), raise_on_status=False))
+"""
+Connection pool shared by all downloaders.
+
+Keeping the connections alive means the icon requests and the
+following audio requests to the same host reuse one socket instead of
+doing a new TCP (and TLS) handshake each time. Connection problems,
+server errors and other failures (e.g. a broken TLS handshake) are
+retried a few times, with a short back-off. Each kind needs its own
+limit, as total=None doesn't stop anything.
+Redirects are followed, up to ten, like urlopen does. The timeout
+keeps a site that stops answering from hanging the download.
+
+maxsize is large enough for all our worker threads (the fetch and
+icon pools) and the calling thread to talk to one host at once. With
+a smaller pool, the extra connections are thrown away after use, and
+each new one costs another DNS lookup and handshake.
+"""
+
+icon_retries = urllib3.Retry(
+    total=None, connect=1, read=1, status=0, other=1, redirect=10,
+    backoff_factor=0, raise_on_status=False)
+"""
+Retries for the site icon requests.
+
+Try a failed connection (or TLS handshake) once more, but don't
+wait. A missing icon is not worth holding up the download. Redirects (e.g. http to https) are
+still followed.
+"""
+
+icon_wait_timeout = 20
+"""
+Seconds get_site_icon() waits for the icon worker.
+
+After that we go on without the icon rather than keep the user
+waiting for the review dialog.
+"""
+
+_fetch_pool = ThreadPoolExecutor(max_workers=4)
+"""
+Worker threads used to get a number of files at the same time.
+
+The downloads are limited by network latency, not by the CPU, so
+waiting for them in parallel threads works fine, GIL or not.
+"""
+
+_file_name_lock = threading.Lock()
+"""Lock used while we look for a free media file name."""
+
+file_chunk_size = 65536
+"""Size of the chunks we copy from the network into audio files."""
+
+_icon_pool = ThreadPoolExecutor(max_workers=2)
+"""Worker threads used to get and scale the site icons."""
+
+_qt = None
+"""The PyQt classes used for the site icons, once imported."""
+
+
+def load_qt():
+    """
+    Return the PyQt classes used for the site icons.
+
+    Return a (QImage, QSize, Qt) tuple, or None when we don't have
+    PyQt. (Make this work without PyQt.) The import is done the first
+    time we need an icon, not when Anki loads the add-on.
+    """
+    global _qt
+    if _qt is None:
+        try:
+            from PyQt5.QtGui import QImage
+            from PyQt5.QtCore import QSize, Qt
+        except ImportError:
+            _qt = False
+        else:
+            _qt = (QImage, QSize, Qt)
+    return _qt or None
 
 
 def uniqify_list(seq):
     """Return a copy of the list with every element appearing only once."""
-    # From http://www.peterbe.com/plog/uniqifiers-benchmark
-    no_dupes = []
-    [no_dupes.append(i) for i in seq if not no_dupes.count(i)]
-    return no_dupes
+    # Dicts keep the insertion order, so this keeps the first
+    # appearance of each element, in linear time.
+    return list(dict.fromkeys(seq))
+
+
+def icon_link_href(page_head):
+    """
+    Return the href of the first <link rel="icon"> tag, or None.
+
+    page_head is the raw start of a page. rel may hold more than one
+    value, as in "shortcut icon". This is a lot quicker than building
+    a BeautifulSoup just for this one tag.
+    """
+    for link_tag in link_tag_re.findall(page_head):
+        attributes = {}
+        for name, dq_value, sq_value, value in \
+                tag_attribute_re.findall(link_tag):
+            attributes[name.lower()] = dq_value or sq_value or value
+        if b'icon' in attributes.get(b'rel', b'').lower().split() \
+                and attributes.get(b'href'):
+            return html.unescape(
+                attributes[b'href'].decode('utf-8', 'replace'))
+    return None
+
+
+@functools.lru_cache()
+def _request_headers(user_agent, compressed):
+    """
+    Return the headers dict for requests with this user agent.
+
+    The dict is built once and then shared by all requests that use
+    the same user agent. Don't change it.
+    """
+    return urllib3.make_headers(
+        user_agent=user_agent, accept_encoding=compressed)
+
+
+def _get(url_in, user_agent, compressed=True, extra_headers=None,
+         **request_args):
+    """
+    Send a GET request through the shared pool and return the response.
+
+    Set the user agent and, when compressed is True, accept gzip and
+    deflate, and add the extra_headers. Other keyword arguments go to
+    urllib3. Raise a ValueError unless we got code 200, or 304 for a
+    conditional request.
+    """
+    headers = _request_headers(user_agent, compressed)
+    if extra_headers:
+        headers = dict(headers, **extra_headers)
+    response = _http.request('GET', url_in, headers=headers, **request_args)
+    if 200 != response.status \
+            and not (304 == response.status and extra_headers):
+        # Throw away the error page, so the connection can be reused.
+        response.drain_conn()
+        response.release_conn()
+        raise ValueError(f'{response.status}: {response.reason}')
+    return response
+
+
+@functools.lru_cache(maxsize=64)
+def _get_data(url_in, user_agent):
+    """
+    Return raw data loaded from an URL.
+
+    This does the work for AudioDownloader.get_data_from_url(). It is
+    a function, so that the cache doesn't keep the downloaders alive.
+    Only successful requests are cached; errors are raised.
+
+    Pages the site sent with an ETag or Last-Modified header are also
+    kept on disk. For those, we send a conditional request and use
+    the stored copy when the site answers 304 Not Modified.
+    """
+    page_path = os.path.join(
+        page_cache_dir, hashlib.sha1(url_in.encode('utf-8')).hexdigest())
+    cached_data, conditional_headers = _load_cached_page(page_path)
+    response = _get(url_in, user_agent, extra_headers=conditional_headers)
+    if 304 == response.status:
+        return cached_data
+    _save_cached_page(page_path, response)
+    return response.data
+
+
+def _load_cached_page(page_path):
+    """
+    Return a page stored by _save_cached_page().
+
+    Return a (data, conditional_headers) pair, where the headers can
+    be sent to ask if the page changed. When we don't have the page,
+    return (None, {}).
+    """
+    try:
+        with open(page_path, 'rb') as page_file:
+            conditional_headers = json.loads(page_file.readline())
+            return page_file.read(), conditional_headers
+    except (OSError, ValueError):
+        return None, {}
+
+
+def _save_cached_page(page_path, response):
+    """
+    Store the page in response, when the site sent a validator.
+
+    The conditional headers go in the first line, as JSON, the page
+    data after that. The file is written under a temporary name and
+    then moved into place, so a reader never sees half a page.
+    """
+    conditional_headers = {}
+    if response.headers.get('ETag'):
+        conditional_headers['If-None-Match'] = response.headers['ETag']
+    if response.headers.get('Last-Modified'):
+        conditional_headers['If-Modified-Since'] = \
+            response.headers['Last-Modified']
+    if not conditional_headers:
+        return
+    try:
+        os.makedirs(page_cache_dir, exist_ok=True)
+        page_file = tempfile.NamedTemporaryFile(
+            dir=page_cache_dir, prefix='.', delete=False)
+    except OSError:
+        # No cache then. We can always download the page again.
+        return
+    try:
+        with page_file:
+            page_file.write(json.dumps(conditional_headers).encode('utf-8'))
+            page_file.write(b'\n')
+            page_file.write(response.data)
+        os.replace(page_file.name, page_path)
+    except OSError:
+        try:
+            os.remove(page_file.name)
+        except OSError:
+            pass
+        return
+    _prune_page_cache()
+
+
+def _prune_page_cache():
+    """
+    Keep the page cache small.
+
+    Remove pages older than page_cache_max_age, and the oldest pages
+    when we have more than page_cache_max_files.
+    """
+    try:
+        page_paths = [
+            os.path.join(page_cache_dir, name)
+            for name in os.listdir(page_cache_dir)]
+        page_times = sorted(
+            ((os.path.getmtime(path), path) for path in page_paths),
+            reverse=True)
+    except OSError:
+        # Another thread removed a file under our feet. Try next time.
+        return
+    too_old = time.time() - page_cache_max_age
+    for index, (mtime, path) in enumerate(page_times):
+        if index >= page_cache_max_files or mtime < too_old:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
 
 
 class AudioDownloader(object):
@@ -45,6 +320,14 @@ class AudioDownloader(object):
 
     The derived classes must implement self.download_files()
     """
+    favicon_misses = set()
+    """
+    Hosts where we didn't get a /favicon.ico.
+
+    Shared by all downloaders, so we ask each host only once per
+    session.
+    """
+
     def __init__(self):
         self.language = ''
         """
@@ -111,6 +394,10 @@ class AudioDownloader(object):
 
         self.site_icon = None
         """The sites's favicon."""
+        self.icon_lock = threading.Lock()
+        """Lock so that we start only one icon download at a time."""
+        self.icon_future = None
+        """The background icon download started by maybe_get_icon."""
 
     def download_files(self, word, base, ruby, split):
         """
@@ -150,84 +437,174 @@ class AudioDownloader(object):
 
     def maybe_get_icon(self):
         """
-        Get icon for the site as a QImage if we haven't already.
+        Start getting the icon for the site if we haven't already.
+
+        The icon is downloaded, decoded and scaled by self.get_icon()
+        in a worker thread, so that this overlaps with the audio
+        download instead of holding up download_files(). Use
+        self.get_site_icon() to get the result. This function can be
+        called repeatedly and loads the icon only once.
+        """
+        with self.icon_lock:
+            if self.site_icon:
+                return
+            if self.icon_future and not self.icon_future.done():
+                # Already on its way.
+                return
+            self.icon_future = _icon_pool.submit(self.get_icon)
+
+    def get_site_icon(self):
+        """
+        Return the site icon.
+
+        Wait for the worker started by self.maybe_get_icon() when it
+        hasn't finished yet, but no longer than icon_wait_timeout
+        seconds.
+        """
+        icon_future = self.icon_future
+        if icon_future:
+            try:
+                icon_future.result(timeout=icon_wait_timeout)
+            except Exception:
+                # Not getting the icon is no reason to drop the files
+                # we downloaded.
+                if DEBUG:
+                    raise
+        return self.site_icon
+
+    def get_icon(self):
+        """
+        Get icon for the site as a QImage.
 
         Get the site icon, either the 'rel="icon"' or the favicon, for
         the web page at url or passed in as page_html and store it as
-        a QImage. This function can be called repeatedly and loads the
-        icon only once.
+        a QImage. Once loaded, the icon is kept in the icon_cache_dir,
+        so later Anki sessions don't download it again.
+
+        This is run in a worker thread by self.maybe_get_icon(). That
+        is fine for QImages, just not for QPixmaps.
         """
-        if self.site_icon:
-            return
-        if not with_pyqt:
+        if not load_qt():
             self.site_icon = None
             return
-        page_request = urllib.request.Request(self.icon_url)
-        if self.user_agent:
-            page_request.add_header('User-agent', self.user_agent)
-        page_response = urllib.request.urlopen(page_request)
-        if 200 != page_response.code:
-            self.get_favicon()
+        if self.load_cached_icon():
             return
-        page_soup = soup(page_response, "html.parser")
+        # Ask for the favicon while we look at the page. We need it
+        # when the page has no icon link, and like this we don't wait
+        # for the two requests one after the other.
+        favicon_future = _fetch_pool.submit(self.get_favicon_data)
         try:
-            icon_url = page_soup.find(
-                name='link', attrs={'rel': 'icon'})['href']
-        except (TypeError, KeyError):
-            self.get_favicon()
+            page_response = _get(
+                self.icon_url, self.user_agent, retries=icon_retries,
+                preload_content=False)
+        except (ValueError, urllib3.exceptions.HTTPError):
+            self.get_favicon(favicon_future)
             return
+        page_head = page_response.read(icon_page_head_size)
+        # Throw away the rest, so the connection can be reused.
+        page_response.drain_conn()
+        page_response.release_conn()
+        icon_url = icon_link_href(page_head)
+        if not icon_url:
+            self.get_favicon(favicon_future)
+            return
+        # We have a link, so we don't need the favicon after all.
+        favicon_future.cancel()
         # The url may be absolute or relative.
         if not urllib.parse.urlsplit(icon_url).netloc:
             icon_url = urllib.parse.urljoin(
                 self.url, urllib.parse.quote(icon_url))
         try:
-            icon_request = urllib.request.Request(icon_url)
-            if self.user_agent:
-                icon_request.add_header('User-agent', self.user_agent)
-            icon_response = urllib.request.urlopen(icon_request)
-            if 200 != icon_response.code:
-                self.site_icon = None
-                return
-        except urllib.error.URLError as ex:
-            if DEBUG:
-                showInfo("URL error for '%s': %s" % (icon_url, ex))
+            icon_data = _get(
+                icon_url, self.user_agent, retries=icon_retries).data
+        except (ValueError, urllib3.exceptions.HTTPError):
+            self.site_icon = None
             return
-        self.site_icon = QImage.fromData(icon_response.read())
-        max_size = QSize(self.max_icon_size, self.max_icon_size)
-        icon_size = self.site_icon.size()
-        if icon_size.width() > max_size.width() \
-                or icon_size.height() > max_size.height():
-            self.site_icon = self.site_icon.scaled(
-                max_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self.install_icon(icon_data)
 
-    def get_favicon(self):
+    def get_favicon(self, favicon_future=None):
         """
         Get favicon for the site.
 
         This is called when the site_url can't be loaded or when that
         page doesn't contain a link tag with rel set to icon (the new
-        way of doing site icons.)
+        way of doing site icons.) Pass in favicon_future when the
+        get_favicon_data() call has already been started.
         """
-        if self.site_icon:
-            return
-        if not with_pyqt:
+        if not load_qt():
             self.site_icon = None
             return
-        ico_url = urllib.parse.urljoin(self.icon_url, "/favicon.ico")
-        ico_request = urllib.request.Request(ico_url)
-        if self.user_agent:
-            ico_request.add_header('User-agent', self.user_agent)
-        ico_response = urllib.request.urlopen(ico_request)
-        if 200 != ico_response.code:
+        if favicon_future:
+            ico_data = favicon_future.result()
+        else:
+            ico_data = self.get_favicon_data()
+        if not ico_data:
             self.site_icon = None
             return
-        self.site_icon = QImage.fromData(ico_response.read())
+        self.install_icon(ico_data)
+
+    def install_icon(self, icon_data):
+        """
+        Make the raw icon_data our site icon.
+
+        Decode the data, scale the image down to max_icon_size when it
+        is larger, store it as self.site_icon and in the disk cache.
+        """
+        QImage, QSize, Qt = load_qt()
+        icon = QImage.fromData(icon_data)
         max_size = QSize(self.max_icon_size, self.max_icon_size)
-        ico_size = self.site_icon.size()
-        if ico_size.width() > max_size.width() \
-                or ico_size.height() > max_size.height():
-            self.site_icon = self.site_icon.scaled(
+        if icon.width() > max_size.width() \
+                or icon.height() > max_size.height():
+            icon = icon.scaled(
                 max_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self.site_icon = icon
+        self.save_cached_icon()
+
+    def get_favicon_data(self):
+        """Return the raw data of the /favicon.ico, or None."""
+        ico_host = urllib.parse.urlsplit(self.icon_url).netloc
+        if ico_host in self.favicon_misses:
+            return None
+        ico_url = urllib.parse.urljoin(self.icon_url, "/favicon.ico")
+        try:
+            return _get(ico_url, self.user_agent, retries=icon_retries).data
+        except (ValueError, urllib3.exceptions.HTTPError):
+            # Not found, or the site doesn't answer. Don't try again.
+            self.favicon_misses.add(ico_host)
+            return None
+
+    def icon_cache_path(self):
+        """Return the path of the cached site icon for self.icon_url."""
+        key = hashlib.sha1(self.icon_url.encode('utf-8')).hexdigest()
+        return os.path.join(icon_cache_dir, key + '.png')
+
+    def load_cached_icon(self):
+        """
+        Load the site icon from the disk cache.
+
+        Return True when self.site_icon was set from the cache. The
+        cached icon has already been scaled down.
+        """
+        icon_path = self.icon_cache_path()
+        if not os.path.exists(icon_path):
+            return False
+        QImage = load_qt()[0]
+        cached_icon = QImage(icon_path)
+        if cached_icon.isNull():
+            return False
+        self.site_icon = cached_icon
+        return True
+
+    def save_cached_icon(self):
+        """Write self.site_icon to the disk cache, when we have one."""
+        if not self.site_icon or self.site_icon.isNull():
+            return
+        try:
+            os.makedirs(icon_cache_dir, exist_ok=True)
+        except OSError:
+            # No cache then. We can always download the icon again.
+            return
+        self.site_icon.save(self.icon_cache_path(), 'PNG')
 
     def get_data_from_url(self, url_in):
         """
@@ -235,29 +612,74 @@ class AudioDownloader(object):
 
         Helper function. Put in an URL and it sets the agent, sends
         the requests, checks that we got error code 200 and returns
-        the raw data only when everything is OK.
-        """
-        # try:
-        #     # There have been reports that the request was send in a
-        #     # 32-bit encoding (UTF-32?). Avoid that. (The whole things
-        #     # is a bit curious, but there shouldn't really be any harm
-        #     # in this.)
-        #     if DEBUG:
-        #         showInfo(url_in)
-        #     request = urllib.request.Request(url_in.encode('utf-8'))
-        # except UnicodeDecodeError:
-        #     request = urllib.request.Request(url_in)
-        # try:
-        #     # dto. But i guess this is even less necessary.
-        #     request.add_header('User-agent', self.user_agent.encode('utf-8'))
-        # except UnicodeDecodeError:
-        #     request.add_header('User-agent', self.user_agent)
-        request = urllib.request.Request(url_in)
-        request.add_header('User-agent', self.user_agent)
-        response = urllib.request.urlopen(request)
-        if 200 != response.code:
-            raise ValueError(str(response.code) + ': ' + response.msg)
-        return response.read()
+        the raw data only when everything is OK. The data is cached
+        for the session, so asking for the same page twice is cheap.
+        """
+        return _get_data(url_in, self.user_agent)
+
+    def get_file_from_url(self, url_in):
+        """
+        Download from an URL straight into a new file.
+
+        Check that we got code 200, get a new file with
+        self.open_new_file() and copy the response to that file in
+        chunks, so we don't keep the whole audio file in memory.
+        Return the (file_path, file_name) pair. When anything goes
+        wrong, no file is left behind.
+        """
+        response = _get(
+            url_in, self.user_agent, compressed=False, preload_content=False)
+        try:
+            out_file, file_path, file_name = self.open_new_file()
+            try:
+                with out_file:
+                    shutil.copyfileobj(response, out_file, file_chunk_size)
+            except:
+                os.remove(file_path)
+                raise
+        finally:
+            response.release_conn()
+        return file_path, file_name
+
+    def get_files_from_urls(self, urls_in, skip_errors=False):
+        """
+        Download a number of URLs into files at once.
+
+        Use this when a page lists more than one file, so we don't
+        wait for each file in turn. Return the list of (file_path,
+        file_name) pairs that self.get_file_from_url() returns, in the
+        order of urls_in.
+
+        When skip_errors is True, failed downloads are just left out.
+        Otherwise, the first error is raised, after the downloads not
+        yet started are cancelled and the files of the others are
+        removed again, so we don't leave files no one knows about.
+        """
+        file_futures = [_fetch_pool.submit(self.get_file_from_url, url)
+                        for url in urls_in]
+        file_list = []
+        for index, file_future in enumerate(file_futures):
+            try:
+                file_list.append(file_future.result())
+            except Exception as error:
+                if skip_errors:
+                    continue
+                later_futures = file_futures[index + 1:]
+                for later_future in later_futures:
+                    later_future.cancel()
+                for later_future in later_futures:
+                    try:
+                        file_list.append(later_future.result())
+                    except Exception:
+                        # Failed or cancelled. No file either way.
+                        pass
+                for file_path, dummy_file_name in file_list:
+                    try:
+                        os.remove(file_path)
+                    except OSError:
+                        pass
+                raise error
+        return file_list
 
     def get_soup_from_url(self, url_in):
         """
@@ -265,6 +687,9 @@ class AudioDownloader(object):
 
         Wrapper helper function aronud self.get_data_from_url()
         """
+        # Only the downloaders that walk a page need BeautifulSoup.
+        # The site icon code doesn't, so import it only here.
+        from bs4 import BeautifulSoup as soup
         return soup(self.get_data_from_url(url_in), "html.parser")
 
     def get_file_name(self):
@@ -273,16 +698,28 @@ class AudioDownloader(object):
 
         Determine where we should write the data and build a free name
         based on that. This looks at self.use_temp_files and
-        self.download_diretory. Read their docstrings.
+        self.download_diretory. Read their docstrings. The file is
+        created, empty.
+        """
+        new_file, file_path, file_name = self.open_new_file()
+        new_file.close()
+        return file_path, file_name
+
+    def open_new_file(self):
+        """
+        Create a new file and return it, open for writing.
+
+        Return a (file, file_path, file_name) triple. Like
+        self.get_file_name(), but we don't close the file just to open
+        it again for the download.
         """
         if self.use_temp_files:
             tfile = tempfile.NamedTemporaryFile(
                 delete=False, suffix=self.file_extension)
-            tfile.close()
             # Hack, free_media_name returns full path and file name,
             # so return two files here as well. But there is no real
             # need to split off the file name from the direcotry bit.
-            return tfile.name, tfile.name
+            return tfile, tfile.name, tfile.name
         else:
             # IAR, specifically PEP8. When we don't use temp files, we
             # should clean up the request string a bit, and that is
@@ -290,5 +727,11 @@ class AudioDownloader(object):
             # self.use_temp_files is False, we need anki, bits of
             # which are imported by ..exists.
             from ..exists import free_media_name
-            return free_media_name(
-                self.base_name, self.file_extension)
+            # We may be downloading more than one file at a time. Only
+            # look for a free name when no one else does, and claim
+            # it straight away.
+            with _file_name_lock:
+                file_path, file_name = free_media_name(
+                    self.base_name, self.file_extension)
+                new_file = open(file_path, 'xb')
+            return new_file, file_path, file_name
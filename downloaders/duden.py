@@ -63,24 +63,26 @@ class DudenDownloader(AudioDownloader):
         self.maybe_get_icon()
         word_soup = self.get_soup_from_url(self.url + m_word)
         blank_links = word_soup.findAll(name='a', target="_blank")
-        for link in blank_links:
-            # I expect no more than one result. So we don't catch
-            # anything here. When something goes wrong with the first
-            # word we don't try to get any later words. Also, when a
-            # link does not contain a title, we will fail.
-            if self.good_link(link):
-                extras = dict(Source="Duden")
-                try:
-                    extras['©'] = re.search('© (.*)', link['title']).group(1)
-                except AttributeError:
-                    # 'NoneType' object has no attribute 'group' ...
-                    pass
-                word_data = self.get_data_from_url(link['href'])
-                word_path, word_fname = self.get_file_name()
-                with open(word_path, 'wb') as word_file:
-                    word_file.write(word_data)
-                self.downloads_list.append(
-                    (word_path, word_fname, extras))
+        # I expect no more than one result. So we don't catch
+        # anything here. When something goes wrong with the first
+        # word we don't try to get any later words. Also, when a
+        # link does not contain a title, we will fail.
+        good_links = [link for link in blank_links if self.good_link(link)]
+        # Look at the titles before we download anything.
+        extras_list = []
+        for link in good_links:
+            extras = dict(Source="Duden")
+            try:
+                extras['©'] = re.search('© (.*)', link['title']).group(1)
+            except AttributeError:
+                # 'NoneType' object has no attribute 'group' ...
+                pass
+            extras_list.append(extras)
+        word_files = self.get_files_from_urls(
+            [link['href'] for link in good_links])
+        for (word_path, word_fname), extras in zip(word_files, extras_list):
+            self.downloads_list.append(
+                (word_path, word_fname, extras))
 
     def good_link(self, link):
         """Check if link looks """
@@ -47,10 +47,8 @@ class GooglettsDownloader(AudioDownloader):
         self.set_names(word, base, ruby)
         if not word:
             raise ValueError('Nothing to download')
-        word_data = self.get_data_from_url(self.build_url(word))
-        word_path, word_file_name = self.get_file_name()
-        with open(word_path, 'wb') as word_file:
-            word_file.write(word_data)
+        word_path, word_file_name = self.get_file_from_url(
+            self.build_url(word))
         # We have a file, but not much to say about it.
         self.downloads_list.append(
             (word_path, word_file_name, dict(Source='GoogleTTS')))
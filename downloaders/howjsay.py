@@ -39,9 +39,6 @@ class HowJSayDownloader(AudioDownloader):
         self.maybe_get_icon()
         audio_url = self.url + urllib.parse.quote(word.encode('utf-8')) \
             + self.file_extension
-        word_data = self.get_data_from_url(audio_url)
-        word_file_path, word_file_name = self.get_file_name()
-        with open(word_file_path, 'wb') as word_file:
-            word_file.write(word_data)
+        word_file_path, word_file_name = self.get_file_from_url(audio_url)
         self.downloads_list.append(
             (word_file_path, word_file_name, extras))
@@ -50,12 +50,8 @@ Gecko/20100101 Firefox/15.0.1'''
             return
         # Only get the icon when we are using Japanese.
         self.maybe_get_icon()
-        # Reason why we don't just do the get_data_.. bit inside the
-        # with: Like this we don't have to clean up the temp file.
-        word_data = self.get_data_from_url(self.query_url(base, ruby))
-        word_file_path, word_file_name = self.get_file_name()
-        with open(word_file_path, 'wb') as word_file:
-            word_file.write(word_data)
+        word_file_path, word_file_name = self.get_file_from_url(
+            self.query_url(base, ruby))
         # We have a file, but not much to say about it.
         self.downloads_list.append(
             (word_file_path, word_file_name, dict(Source='JapanesePod')))
@@ -15,14 +15,7 @@ import os
 import sys
 import urllib.request, urllib.parse, urllib.error
 
-# Make this work without PyQt
-with_pyqt = True
-try:
-    from PyQt5.QtGui import QImage
-except ImportError:
-    with_pyqt = False
-
-from .downloader import AudioDownloader
+from .downloader import AudioDownloader, load_qt
 
 
 class LeoDownloader(AudioDownloader):
@@ -77,11 +70,8 @@ class LeoDownloader(AudioDownloader):
         self.get_flag_icon()
         # EAFP. self.query_url may return None...
         word_url = self.query_url(word, ruby)
-        # ... then the get_data will blow up
-        word_data = self.get_data_from_url(word_url)
-        word_file_path, word_file_name = self.get_file_name()
-        with open(word_file_path, 'wb') as word_file:
-            word_file.write(word_data)
+        # ... then the get_file will blow up
+        word_file_path, word_file_name = self.get_file_from_url(word_url)
         # We have a file, but not much to say about it.
         self.downloads_list.append(
             (word_file_path, word_file_name, dict(Source='Leo')))
@@ -136,8 +126,10 @@ class LeoDownloader(AudioDownloader):
         language.  We store these icons in self.site_icon_dict and use the
         AudioDownloader.maybe_get_icon() if we don't have it yet.
         """
-        if not with_pyqt:
+        qt = load_qt()
+        if not qt:
             return
+        QImage = qt[0]
         try:
             # If this works we already have it.
             self.site_icon = self.site_icon_dict[self.language]
@@ -66,9 +66,6 @@ class LexinDownloader(AudioDownloader):
         extras = dict(Source="Lexin")
         self.maybe_get_icon()
         audio_url = self.url + m_word + self.file_extension
-        word_data = self.get_data_from_url(audio_url)
-        word_file_path, word_file_name = self.get_file_name()
-        with open(word_file_path, 'wb') as word_file:
-            word_file.write(word_data)
+        word_file_path, word_file_name = self.get_file_from_url(audio_url)
         self.downloads_list.append(
             (word_file_path, word_file_name, extras))
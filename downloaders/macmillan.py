@@ -52,16 +52,12 @@ class MacmillanDownloader(AudioDownloader):
             self.url + urllib.parse.quote(word.encode('utf-8')))
         # The audio clips are stored as images with class sound and
         # the link hidden in the onclick bit.
-        sounds = word_soup.findAll(True, {'class': sound_class})
-        for sound_tag in sounds:
-            audio_url = sound_tag.get('data-src-mp3')
-            if not audio_url:
-                continue
-            word_data = self.get_data_from_url(audio_url)
-
-            word_file_path, word_file_name = self.get_file_name()
-            with open(word_file_path, 'wb') as word_file:
-                word_file.write(word_data)
+        sounds = [sound_tag for sound_tag in word_soup.findAll(
+            True, {'class': sound_class}) if sound_tag.get('data-src-mp3')]
+        word_files = self.get_files_from_urls(
+            [sound_tag.get('data-src-mp3') for sound_tag in sounds])
+        for sound_tag, (word_file_path, word_file_name) \
+                in zip(sounds, word_files):
             extras = self.extras
             try:
                 alt_string = sound_tag['alt']
@@ -136,11 +136,7 @@ class MerriamWebsterDownloader(AudioDownloader):
             self.get_popup_url(base_name, word))
         # The audio clip is the only embed tag.
         popup_embed = popup_soup.find(name='embed')
-        word_data = self.get_data_from_url(popup_embed['src'])
-        word_path, word_fname = self.get_file_name()
-        with open(word_path, 'wb') as word_file:
-            word_file.write(word_data)
-        return word_path, word_fname
+        return self.get_file_from_url(popup_embed['src'])
 
     def get_popup_url(self, base_name, source):
         """Build url for the MW play audio pop-up."""
@@ -14,15 +14,7 @@ import urllib.request, urllib.parse, urllib.error
 import urllib.parse
 import re
 
-from .downloader import AudioDownloader, uniqify_list
-
-# Make this work without PyQt
-with_pyqt = True
-try:
-    from PyQt5.QtGui import QImage
-    from PyQt5.QtCore import QSize, Qt
-except ImportError:
-    with_pyqt = False
+from .downloader import AudioDownloader, load_qt, uniqify_list
 
 
 class WiktionaryDownloader(AudioDownloader):
@@ -102,36 +94,25 @@ class WiktionaryDownloader(AudioDownloader):
                          video_url, flags=re.IGNORECASE):
                 ogg_url_list.append(video_url)
         ogg_url_list = uniqify_list(ogg_url_list)
-        for url_to_get in ogg_url_list:
-            # We may have to add a scheme or a scheme and host
-            # name (netloc). urlparse to the rescue!
-            word_url = urllib.parse.urljoin(
-                self.url.format(self.language, ''), url_to_get)
-            try:
-                word_data = self.get_data_from_url(word_url)
-            except:
-                continue
-            word_path, word_fname = self.get_file_name()
-            with open(word_path, 'wb') as word_file:
-                word_file.write(word_data)
+        # We may have to add a scheme or a scheme and host
+        # name (netloc). urlparse to the rescue!
+        word_urls = [urllib.parse.urljoin(
+            self.url.format(self.language, ''), url_to_get)
+            for url_to_get in ogg_url_list]
+        for word_path, word_fname in self.get_files_from_urls(
+                word_urls, skip_errors=True):
             self.downloads_list.append(
                 (word_path, word_fname, dict(Source="Wiktionary")))
 
-    def maybe_get_icon(self):
-        if self.site_icon:
-            return
-        if not with_pyqt:
+    def get_icon(self):
+        if not load_qt():
             self.site_icon = None
             return
+        if self.load_cached_icon():
+            return
         try:
             icon_data = self.get_data_from_url(self.full_icon_url)
         except:
-            AudioDownloader.maybe_get_icon(self)
+            AudioDownloader.get_icon(self)
         else:
-            self.site_icon = QImage.fromData(icon_data)
-            max_size = QSize(self.max_icon_size, self.max_icon_size)
-            ico_size = self.site_icon.size()
-            if ico_size.width() > max_size.width() \
-                    or ico_size.height() > max_size.height():
-                self.site_icon = self.site_icon.scaled(
-                    max_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self.install_icon(icon_data)